@@ -11,19 +11,24 @@
 
 import os
 import time
-import json
-import base64
-import urllib.parse
-import urllib.request
-import urllib.error
 import re
 import unicodedata
-import hashlib
 import random
-from datetime import datetime
-from typing import List, Tuple, Dict, Optional
-
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from itertools import chain, islice, zip_longest
+from types import MappingProxyType
+from typing import Callable, Iterable, List, NamedTuple, Tuple, Dict, Optional
+from urllib.parse import urlencode
+
+import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # =========================
 #  UI: Page & Branding
@@ -90,22 +95,52 @@ GENRE_THEMES = {
                    "image": "assets/bg_default.jpg",    "emoji": "🎵", "font": "system-ui"},
 }
 
-def _interleave_lists(lists: List[List[Tuple[str, str]]]) -> List[Tuple[str, str]]:
+@dataclass(frozen=True, slots=True)
+class Theme:
+    accent: str
+    gradient: str
+    image_url: str = ""
+    emoji: str = "🎵"
+    font: str = "system-ui"
+
+def _as_theme(v: dict) -> Theme:
+    """Defaults are filled once here, so readers use plain attribute access."""
+    return Theme(v["accent"], v["gradient"], v.get("image", "").strip(), v.get("emoji", "🎵"), v.get("font", "system-ui"))
+
+GENRE_THEMES = {k: _as_theme(v) for k, v in GENRE_THEMES.items()}
+
+_FILL = object()
+
+def _entry_text(entry: Tuple[str, str]) -> str:
+    return entry[0]
+
+def _interleave_lists(
+    lists: List[List[Tuple[str, str]]], key: Optional[Callable] = None, limit: Optional[int] = None
+) -> List[Tuple[str, str]]:
+    # Round-robin across lists; zip_longest/chain keep the per-element work in C.
+    # With `key`, later items whose key was already emitted are dropped (set lookup, not a list scan).
+    # With `limit`, merging stops once that many items are out (the generator is never drained).
+    merged = (x for x in chain.from_iterable(zip_longest(*lists, fillvalue=_FILL)) if x is not _FILL)
+    if key is None:
+        return list(islice(merged, limit))
+    seen = set()
     out: List[Tuple[str, str]] = []
-    max_len = max((len(lst) for lst in lists), default=0)
-    for i in range(max_len):
-        for lst in lists:
-            if i < len(lst):
-                out.append(lst[i])
+    for x in merged:
+        k = key(x)
+        if k not in seen:
+            seen.add(k)
+            out.append(x)
+            if limit is not None and len(out) >= limit:
+                break
     return out
 
-def build_css_theme(primary: dict, secondary: dict | None = None) -> dict:
-    gradient = primary["gradient"] if not secondary else (
-        f"linear-gradient(135deg,{primary['accent']}55 0%,{secondary['accent']}55 100%), {primary['gradient']}"
+def build_css_theme(primary: Theme, secondary: Theme | None = None) -> dict:
+    gradient = primary.gradient if not secondary else (
+        f"linear-gradient(135deg,{primary.accent}55 0%,{secondary.accent}55 100%), {primary.gradient}"
     )
-    image_url = primary.get("image", "").strip()
-    accent = primary["accent"]
-    font = primary.get("font", "system-ui")
+    image_url = primary.image_url
+    accent = primary.accent
+    font = primary.font
     css = f"""
     <style>
     .stApp {{
@@ -136,44 +171,99 @@ def build_css_theme(primary: dict, secondary: dict | None = None) -> dict:
     }}
     </style>
     """
-    icon_set = {"artist": primary.get("emoji", "🎵"), "genre": "🏷️", "spark": "✨"}
-    return {"css": css, "emoji": primary.get("emoji", "🎵"), "accent": accent, "icons": icon_set}
-
+    icon_set = {"artist": primary.emoji, "genre": "🏷️", "spark": "✨"}
+    return {"css": css, "emoji": primary.emoji, "accent": accent, "icons": icon_set}
+
+@st.cache_data(show_spinner=False)
+def _build_css_theme_cached(primary_key: str, secondary_key: Optional[str] = None) -> dict:
+    """build_css_theme keyed by GENRE_THEMES keys, so the CSS is formatted once per genre pair."""
+    default = GENRE_THEMES["__default__"]
+    primary = GENRE_THEMES.get(primary_key, default)
+    secondary = GENRE_THEMES.get(secondary_key, default) if secondary_key is not None else None
+    return build_css_theme(primary, secondary)
+
+# Checked in order, so e.g. "k-pop rap" still maps to "hip hop" as before.
+_GENRE_RULES = (
+    (re.compile(r"hip hop|hip-hop|rap"), "hip hop"),
+    (re.compile(r"k-pop|kpop"), "k-pop"),
+    (re.compile(r"rock"), "rock"),
+)
+
+@lru_cache(maxsize=1024)
 def _normalize_genre_label(g: str) -> str:
     """Canonical labels for theme mapping; treat anything containing 'rock' as 'rock'."""
     g_norm = (g or "").lower().strip()
-    if "hip hop" in g_norm or "hip-hop" in g_norm or "rap" in g_norm:
-        return "hip hop"
-    if "k-pop" in g_norm or "kpop" in g_norm:
-        return "k-pop"
-    if "rock" in g_norm:
-        return "rock"
+    for pattern, canon in _GENRE_RULES:
+        if pattern.search(g_norm):
+            return canon
     return g_norm
 
 def pick_theme_by_genres(genres: List[str]) -> dict:
-    counts: Dict[str, int] = {}
-    for g in genres:
-        g_norm = _normalize_genre_label(g)
-        if g_norm in GENRE_THEMES:
-            counts[g_norm] = counts.get(g_norm, 0) + 1
-    top = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    # most_common keeps first-seen order on ties, same as the stable sort it replaces.
+    top = Counter(g_norm for g in genres if (g_norm := _normalize_genre_label(g)) in GENRE_THEMES).most_common(2)
     if not top:
-        theme = build_css_theme(GENRE_THEMES["__default__"])
-        return theme
-    primary = GENRE_THEMES.get(top[0][0], GENRE_THEMES["__default__"])
-    secondary = GENRE_THEMES.get(top[1][0], GENRE_THEMES["__default__"]) if len(top) >= 2 else None
-    theme = build_css_theme(primary, secondary)
+        return _build_css_theme_cached("__default__")
+    # The cache hands back a copy, so the emoji override below can't leak between reruns.
+    theme = _build_css_theme_cached(top[0][0], top[1][0] if len(top) >= 2 else None)
     # Force guitar emoji/icons if any input genre mentions "rock"
     if any(("rock" in (g or "").lower()) for g in genres):
         theme["emoji"] = "🎸"
         theme["icons"]["artist"] = "🎸"
     return theme
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def _theme_and_badges(genres: Tuple[str, ...]) -> Tuple[dict, str]:
+    """Theme plus the 'Detected genres' badge markdown; both depend only on the (ordered) genre list."""
+    theme = pick_theme_by_genres(list(genres))
+    unique_genres = sorted({g.lower() for g in genres})[:6]
+    if unique_genres:
+        badges = " ".join([f"<span class='badge'>{g}</span>" for g in unique_genres])
+    else:
+        badges = "<span class='badge'>mixed/unknown</span>"
+    return theme, "**🏷️ Detected genres:** " + badges
+
 # =========================
 #  Spotify Client (Client Credentials; allowed endpoints only)
 # =========================
 SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
 SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+ARTISTS_BATCH_SIZE = 50     # max ids accepted by GET /v1/artists
+RESPONSE_CACHE_SIZE = 1024  # GET responses kept by _cached_api_get (LRU beyond this)
+MAX_INFLIGHT_REQUESTS = 8   # per client; the client is shared across sessions, so this caps the process
+SEARCH_FALLBACK_TIER = 3    # fallback searches issued together once the first variant misses
+DISK_CACHE_TTL = 24 * 3600  # artist payloads (top tracks, related, genres) kept on disk across restarts
+DISK_CACHE_PATH = os.getenv("SONGREC_CACHE_PATH") or os.path.join(os.path.expanduser("~"), ".cache", "songrec", "responses.sqlite3")
+_DISK_CACHED_PREFIX = "/artists"  # searches stay memory-only; they're cheap to redo and high-cardinality
+_TRACK_URL_TMPL = "https://open.spotify.com/track/%s"
+_ARTIST_URL_TMPL = "https://open.spotify.com/artist/%s"
+_EMPTY_LEAD = MappingProxyType({"id": "", "name": ""})  # stand-in lead artist when a track has none
+_EMPTY_MAP = MappingProxyType({})  # stand-in for a missing external_urls mapping
+
+try:
+    import orjson
+    def _loads(body: bytes):
+        return orjson.loads(body)
+except Exception:
+    import json
+    def _loads(body: bytes):
+        return json.loads(body)
+
+def _build_session() -> requests.Session:
+    """
+    Keep-alive HTTP session for one client:
+      - Pooled connections so repeated calls reuse the same TLS connection.
+      - Retries 429/5xx with backoff, honoring Spotify's Retry-After header.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
+    return session
 
 class SpotifyClient:
     def __init__(self, client_id: str, client_secret: str, market: str = "US"):
@@ -182,34 +272,56 @@ class SpotifyClient:
         self.market = (market or "US").upper()
         self._access_token: Optional[str] = None
         self._expires_at: float = 0.0
+        self._auth_headers: Dict[str, str] = {}
+        self._session = _build_session()
+        self._token_lock = threading.Lock()
+        self._inflight = threading.BoundedSemaphore(MAX_INFLIGHT_REQUESTS)
 
     def _fetch_access_token(self) -> None:
-        basic = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode("utf-8")).decode("utf-8")
-        data = urllib.parse.urlencode({"grant_type": "client_credentials"}).encode("utf-8")
-        req = urllib.request.Request(
+        resp = self._session.post(
             SPOTIFY_TOKEN_URL,
-            data=data,
-            headers={"Authorization": f"Basic {basic}", "Content-Type": "application/x-www-form-urlencoded"},
-            method="POST",
+            data={"grant_type": "client_credentials"},
+            auth=(self.client_id, self.client_secret),
+            timeout=15,
         )
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
-            self._access_token = payload["access_token"]
-            self._expires_at = time.time() + float(payload.get("expires_in", 3600)) * 0.95
+        resp.raise_for_status()
+        payload = _loads(resp.content)
+        self._access_token = payload["access_token"]
+        self._auth_headers = {"Authorization": f"Bearer {self._access_token}"}
+        self._expires_at = time.time() + float(payload.get("expires_in", 3600)) * 0.95
 
     def _ensure_token(self) -> str:
-        if not self._access_token or time.time() >= self._expires_at:
-            self._fetch_access_token()
-        return self._access_token
+        # Serialized so concurrent callers don't all refresh an expired token at once.
+        with self._token_lock:
+            if not self._access_token or time.time() >= self._expires_at:
+                self._fetch_access_token()
+            return self._access_token
+
+    def _headers(self) -> Dict[str, str]:
+        # Built once per token in _fetch_access_token; replaced, never mutated, so sharing is safe.
+        self._ensure_token()
+        return self._auth_headers
 
     def _api_get(self, path: str, params: Dict[str, str] = None) -> Dict:
-        token = self._ensure_token()
+        # Served from the cross-rerun response cache; only misses reach the network.
+        return _cached_api_get(self, self.client_id, path, tuple(sorted((params or {}).items())))
+
+    def _api_get_raw(self, path: str, params: Dict[str, str] = None) -> bytes:
         url = f"{SPOTIFY_API_BASE}{path}"
-        if params:
-            url += "?" + urllib.parse.urlencode(params)
-        req = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"}, method="GET")
-        with urllib.request.urlopen(req, timeout=20) as resp:
-            return json.loads(resp.read().decode("utf-8"))
+        headers = self._headers()
+        with self._inflight:
+            resp = self._session.get(url, params=params, headers=headers, timeout=20)
+        if resp.status_code == 401:
+            # Token revoked/expired early: drop it and re-auth once.
+            self._access_token = None
+            headers = self._headers()
+            with self._inflight:
+                resp = self._session.get(url, params=params, headers=headers, timeout=20)
+        resp.raise_for_status()
+        return resp.content
+
+    def _api_get_uncached(self, path: str, params: Dict[str, str] = None) -> Dict:
+        return _loads(self._api_get_raw(path, params))
 
     # Search helpers
     def search_track(self, title: str, artist: str, limit: int = 50) -> List[Dict]:
@@ -245,9 +357,22 @@ class SpotifyClient:
         data = self._api_get("/search", {"q": n, "type": "artist", "limit": str(limit), "market": self.market})
         return (data.get("artists") or {}).get("items", []) or []
 
+    def search_multi(self, query: str, types: str = "track,artist", limit: int = 5) -> Dict[str, List[Dict]]:
+        """One /search call for several result types; returns e.g. {"tracks": [...], "artists": [...]}."""
+        q = (query or "").strip()
+        if not q: return {}
+        data = self._api_get("/search", {"q": q, "type": types, "limit": str(limit), "market": self.market})
+        return {f"{t}s": (data.get(f"{t}s") or {}).get("items", []) or [] for t in types.split(",")}
+
     # Artist data
-    def get_artist(self, artist_id: str) -> Dict:
-        return self._api_get(f"/artists/{artist_id}", {})
+    def get_artists_bulk(self, ids: List[str]) -> List[Dict]:
+        """Full artist objects for `ids` (input order, unknown ids skipped) in ceil(N/50) requests."""
+        ids = [aid for aid in dict.fromkeys(ids) if aid]
+        found: List[Dict] = []
+        for i in range(0, len(ids), ARTISTS_BATCH_SIZE):
+            data = self._api_get("/artists", {"ids": ",".join(ids[i:i + ARTISTS_BATCH_SIZE])})
+            found.extend(ar for ar in (data.get("artists") or []) if ar and ar.get("id"))
+        return found
 
     def get_artist_top_tracks(self, artist_id: str, limit: int = 10) -> List[Dict]:
         data = self._api_get(f"/artists/{artist_id}/top-tracks", {"market": self.market})
@@ -270,16 +395,85 @@ class SpotifyClient:
     @staticmethod
     def extract_track_core(track: Dict) -> Tuple[str, str, str, str, str]:
         tid = track.get("id") or ""
-        tname = track.get("name") or ""
-        artists = track.get("artists") or []
-        a_id = artists[0].get("id") if artists else ""
-        a_name = artists[0].get("name") if artists else ""
-        turl = (track.get("external_urls") or {}).get("spotify") or (f"https://open.spotify.com/track/{tid}" if tid else "")
-        return tid, tname, a_id, a_name, turl
+        artists = track.get("artists")
+        lead = artists[0] if artists else _EMPTY_LEAD
+        turl = (track.get("external_urls") or _EMPTY_MAP).get("spotify") or (_TRACK_URL_TMPL % tid if tid else "")
+        return tid, track.get("name") or "", lead.get("id"), lead.get("name"), turl
+
+class _DiskCache:
+    """
+    Tiny SQLite store of raw response bodies with a TTL, so artist lookups survive process restarts.
+    Failures are swallowed: a broken cache only costs the network round trip it would have saved.
+    """
+    def __init__(self, path: str, ttl: float):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored REAL, body BLOB)")
+        self._db.execute("DELETE FROM responses WHERE stored < ?", (time.time() - ttl,))
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT stored, body FROM responses WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or row[0] < time.time() - self.ttl:
+            return None
+        return row[1]
+
+    def put(self, key: str, body: bytes) -> None:
+        try:
+            with self._lock:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, time.time(), body))
+        except sqlite3.Error:
+            pass
+
+@st.cache_resource(show_spinner=False)
+def _get_disk_cache() -> Optional[_DiskCache]:
+    """Opened once per process; None (memory cache only) if the cache dir isn't writable."""
+    try:
+        return _DiskCache(DISK_CACHE_PATH, DISK_CACHE_TTL)
+    except (OSError, sqlite3.Error):
+        return None
+
+@st.cache_data(ttl=3600, max_entries=RESPONSE_CACHE_SIZE, show_spinner=False)
+def _cached_api_get(_sp: SpotifyClient, client_id: str, path: str, params: Tuple[Tuple[str, str], ...]) -> Dict:
+    """
+    Spotify GET responses cached across reruns and Regenerate clicks (1h TTL, bounded LRU).
+    Keyed on (client_id, path, params); `_sp` is only used on a miss and is not hashed.
+    Streamlit returns a fresh copy per call, so callers may shuffle results in place.
+    Artist endpoints are additionally backed by the on-disk cache, keyed on path + params only
+    (responses don't depend on the credentials).
+    """
+    disk = _get_disk_cache() if path.startswith(_DISK_CACHED_PREFIX) else None
+    if disk is None:
+        return _sp._api_get_uncached(path, dict(params))
+    key = f"{path}?{urlencode(params)}"
+    body = disk.get(key)
+    if body is None:
+        body = _sp._api_get_raw(path, dict(params))
+        disk.put(key, body)
+    return _loads(body)
+
+@st.cache_resource(show_spinner=False)
+def get_sp_client(client_id: str, client_secret: str, market: str = "US") -> SpotifyClient:
+    """One long-lived client (token + pooled session) per credentials/market, shared across reruns."""
+    return SpotifyClient(client_id, client_secret, market=market)
 
 # =========================
 #  Fuzzy + Resolution helpers
 # =========================
+def _map_parallel(fn, items, workers: int = 8) -> list:
+    """Run independent (network-bound) calls concurrently; results keep the input order."""
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(it) for it in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as ex:
+        return list(ex.map(fn, items))
+
 try:
     from rapidfuzz import fuzz
     def _ratio(a: str, b: str) -> float:
@@ -289,100 +483,233 @@ except Exception:
     def _ratio(a: str, b: str) -> float:
         return SequenceMatcher(None, a, b).ratio() * 100.0
 
+try:
+    import numpy as np
+    from rapidfuzz import process
+    def _ratio_many(query: str, choices: List[str]) -> "np.ndarray":
+        """Score `query` against every choice in one C call (empty query/choice scores 0)."""
+        if not query or not choices:
+            return np.zeros(len(choices))
+        row = process.cdist([query], choices, scorer=fuzz.token_sort_ratio, dtype=np.float64)[0]
+        row[[i for i, c in enumerate(choices) if not c]] = 0.0
+        return row
+    def _best_weighted(a_scores, t_scores) -> Tuple[int, float]:
+        """Index and value of the best 0.6*artist + 0.4*title score (first max wins)."""
+        scores = 0.6 * np.asarray(a_scores) + 0.4 * np.asarray(t_scores)
+        best = int(scores.argmax())
+        return best, float(scores[best])
+except Exception:
+    def _ratio_many(query: str, choices: List[str]) -> List[float]:
+        if not query:
+            return [0.0] * len(choices)
+        return [_ratio(query, c) for c in choices]
+    def _best_weighted(a_scores, t_scores) -> Tuple[int, float]:
+        scores = [0.6 * a + 0.4 * t for a, t in zip(a_scores, t_scores)]
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return best, scores[best]
+
+_RE_NONALNUM = re.compile(r"[^a-z0-9\s]")
+_RE_WS = re.compile(r"\s+")
+
+@lru_cache(maxsize=4096)
 def _clean(s: str) -> str:
+    # NFKD + ascii/ignore strips accents (and any other non-ASCII) in C instead of a per-char generator.
+    # ASCII has no decompositions, so the common pure-ASCII case skips both steps.
     s = s or ""
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
     s = s.lower()
-    s = re.sub(r"[^a-z0-9\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    s = _RE_NONALNUM.sub(" ", s)
+    return _RE_WS.sub(" ", s).strip()
 
 def _try_search_variants(sp: SpotifyClient, title: str, artist: str, limit: int = 10) -> List[dict]:
-    results: List[dict] = []
-    try:
-        results = sp.search_tracks_filtered(title=title, artist=artist, limit=limit) or []
-    except Exception:
-        results = []
-    if not results:
+    """Try progressively looser searches; return the first non-empty result set."""
+    free_q = " ".join([title or "", artist or ""]).strip()
+    t_first = (title or "").split()[0] if (title or "").split() else ""
+    a_first = (artist or "").split()[0] if (artist or "").split() else ""
+    strategies = [
+        (sp.search_tracks_filtered, (title, artist)),
+        (sp.search_tracks_free, (free_q,)) if free_q else None,
+        (sp.search_track, (title, artist)),
+        (sp.search_track, (title, "")) if title else None,
+        (sp.search_track, ("", artist)) if artist else None,
+        (sp.search_track, (t_first, a_first)) if (t_first or a_first) else None,
+    ]
+    strategies = [strategy for strategy in strategies if strategy is not None]
+
+    def _run(strategy) -> List[dict]:
+        fn, args = strategy
         try:
-            q = " ".join([title or "", artist or ""]).strip()
-            if q:
-                results = sp.search_tracks_free(q, limit=limit) or []
+            return fn(*args, limit=limit) or []
         except Exception:
-            results = []
-    if not results:
-        try: results = sp.search_track(title, artist, limit=limit) or []
-        except Exception: results = []
-    if not results and title:
-        try: results = sp.search_track(title, "", limit=limit) or []
-        except Exception: pass
-    if not results and artist:
-        try: results = sp.search_track("", artist, limit=limit) or []
-        except Exception: pass
-    if not results:
-        t_first = (title or "").split()[0] if title else ""
-        a_first = (artist or "").split()[0] if artist else ""
-        if t_first or a_first:
-            try: results = sp.search_track(t_first, a_first, limit=limit) or []
-            except Exception: pass
-    return results
-
-def resolve_favorite_to_artist(
+            return []
+
+    # The first search usually hits; after a miss, fire the fallbacks a tier at a time and
+    # take the first non-empty one in ladder order (so the result doesn't depend on timing).
+    results = _run(strategies[0])
+    if results:
+        return results
+    for i in range(1, len(strategies), SEARCH_FALLBACK_TIER):
+        for results in _map_parallel(_run, strategies[i:i + SEARCH_FALLBACK_TIER]):
+            if results:
+                return results
+    return []
+
+def _match_favorite_lead(
     sp: SpotifyClient,
     title: str,
     artist: str,
     limit: int = 10,
     accept_threshold: float = 72.0,
-) -> Optional[Tuple[str, str, List[str]]]:
-    title_clean = _clean(title)
-    artist_clean = _clean(artist)
+) -> Optional[Tuple[str, str]]:
+    """Fuzzy-match a favorite to a track; returns (lead artist id, lead artist name) without fetching the artist."""
     candidates = _try_search_variants(sp, title, artist, limit=limit)
-    best_item = None
-    best_score = -1.0
-    for tr in candidates:
-        tr_title_clean = _clean(tr.get("name", ""))
-        artists = tr.get("artists") or []
-        lead_name_clean = _clean(artists[0].get("name", "")) if artists else ""
-        score_title = _ratio(title_clean, tr_title_clean) if title_clean else 0.0
-        score_artist = _ratio(artist_clean, lead_name_clean) if artist_clean else 0.0
-        score = 0.6 * score_artist + 0.4 * score_title
-        if score > best_score:
-            best_score = score
-            best_item = tr
-    if best_item is None or best_score < accept_threshold:
+    return _best_track_lead(_clean(title), _clean(artist), candidates, accept_threshold)
+
+def _best_track_lead(
+    title_clean: str,
+    artist_clean: str,
+    candidates: List[dict],
+    accept_threshold: float = 72.0,
+) -> Optional[Tuple[str, str]]:
+    """Score candidate tracks (0.6 lead artist + 0.4 title); lead of the best one if it clears the threshold."""
+    if not candidates:
         return None
+    top_artists = candidates[0].get("artists") or [{}]
+    if (
+        title_clean and artist_clean
+        and _clean(candidates[0].get("name", "")) == title_clean
+        and _clean(top_artists[0].get("name", "")) == artist_clean
+    ):
+        # Exact hit on the first result scores 100, the max, and the first max wins: skip scoring.
+        best_item = candidates[0]
+    else:
+        cand_titles = [_clean(tr.get("name", "")) for tr in candidates]
+        cand_artists = [_clean(((tr.get("artists") or [{}])[0]).get("name", "")) for tr in candidates]
+        t_scores = _ratio_many(title_clean, cand_titles)
+        a_scores = _ratio_many(artist_clean, cand_artists)
+        best, best_score = _best_weighted(a_scores, t_scores)
+        if best_score < accept_threshold:
+            return None
+        best_item = candidates[best]
     artists = best_item.get("artists") or []
-    aid = artists[0].get("id") if artists else None
-    adata = sp.get_artist(aid) if aid else {}
     return (
-        aid or "",
-        adata.get("name") or (artists[0].get("name") if artists else ""),
-        adata.get("genres", []) or [],
+        (artists[0].get("id") if artists else None) or "",
+        artists[0].get("name") if artists else "",
     )
 
-def resolve_artist_robust(sp: SpotifyClient, title: str, artist: str) -> Optional[Tuple[str, str, List[str]]]:
+def _match_multi_lead(
+    sp: SpotifyClient,
+    title: str,
+    artist: str,
+    limit: int = 10,
+    accept_threshold: float = 72.0,
+) -> Optional[Tuple[str, str]]:
+    """
+    One type=track,artist search for the favorite. Only exact (cleaned) artist-name matches whose
+    track title also clears `accept_threshold` are accepted here; a bare artist hit counts only when
+    no track title in the response matches. Everything else is left to the fuzzy chain, which
+    searches by field.
+    """
+    artist_clean = _clean(artist)
+    if not artist_clean:
+        return None
+    found = sp.search_multi(f"{title or ''} {artist}", types="track,artist", limit=limit)
+    title_clean = _clean(title)
+    tracks = found.get("tracks", [])
+    title_scores = _ratio_many(title_clean, [_clean(tr.get("name", "")) for tr in tracks])
+    titled = [tr for tr, score in zip(tracks, title_scores) if score >= accept_threshold]
+    same_artist = [
+        tr for tr in titled
+        if _clean(((tr.get("artists") or [{}])[0]).get("name", "")) == artist_clean
+    ]
+    lead = _best_track_lead(title_clean, artist_clean, same_artist, accept_threshold)
+    if lead and lead[0]:
+        return lead
+    if titled:
+        # The title matched under another artist name: a same-named artist here proves nothing.
+        return None
+    for a in found.get("artists", []):
+        if a.get("id") and _clean(a.get("name", "")) == artist_clean:
+            return (a["id"], a.get("name", ""))
+    return None
+
+def _resolve_artist_lead(sp: SpotifyClient, title: str, artist: str) -> Optional[Tuple[str, str]]:
+    """
+    Robust (artist id, name) for a favorite:
+      - One combined track+artist search, which settles exact-artist favorites in a single round-trip.
+      - Otherwise the old chain: fuzzy track match, then artist search, then title-only search.
+    """
+    try:
+        r = _match_multi_lead(sp, title, artist)
+        if r: return r
+    except Exception:
+        pass
     try:
-        r = resolve_favorite_to_artist(sp, title, artist, limit=10, accept_threshold=72.0)
+        r = _match_favorite_lead(sp, title, artist, limit=10, accept_threshold=72.0)
         if r: return r
         if artist:
             items = sp.search_artist_by_name(artist, limit=3)
             if items:
                 a = items[0]
-                aid = a.get("id", "")
-                adata = sp.get_artist(aid) if aid else {}
-                return (aid, adata.get("name", a.get("name","")), adata.get("genres", []) or [])
+                return (a.get("id", ""), a.get("name", ""))
         if title and not artist:
             items = sp.search_track(title, "", limit=3)
             if items:
                 tid, tname, pa_id, pa_name, _ = SpotifyClient.extract_track_core(items[0])
                 if pa_id:
-                    adata = sp.get_artist(pa_id)
-                    return (pa_id, adata.get("name", pa_name), adata.get("genres", []) or [])
+                    return (pa_id, pa_name)
     except Exception:
         return None
     return None
 
+def _unique_by_artist(infos: List[Tuple[str, str, List[str]]]) -> List[Tuple[str, str, List[str]]]:
+    """First entry per artist id, so favorites by the same artist share one set of per-artist fetches."""
+    seen = set()
+    return [ai for ai in infos if ai[0] not in seen and not seen.add(ai[0])]
+
+class _PartialResolution(Exception):
+    """Raised inside the cached resolver so incomplete results are never memoized."""
+
+def _resolve_favorites_uncached(
+    sp: SpotifyClient, favorites: List[Tuple[str, str]], strict: bool = False
+) -> List[Tuple[str, str, List[str]]]:
+    leads = _map_parallel(lambda ta: _resolve_artist_lead(sp, *ta), favorites)
+    if strict and not all(lead and lead[0] for lead in leads):
+        raise _PartialResolution()
+    leads = [lead for lead in leads if lead and lead[0]]
+    try:
+        by_id = {ar["id"]: ar for ar in sp.get_artists_bulk([aid for (aid, _name) in leads])}
+    except Exception:
+        if strict:
+            raise
+        by_id = {}  # still usable without genres
+    infos: List[Tuple[str, str, List[str]]] = []
+    for aid, name in leads:
+        adata = by_id.get(aid, {})
+        infos.append((aid, adata.get("name") or name, adata.get("genres", []) or []))
+    return infos
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _resolve_favorites_cached(
+    _sp: SpotifyClient, client_id: str, market: str, favorites: Tuple[Tuple[str, str], ...]
+) -> List[Tuple[str, str, List[str]]]:
+    return _resolve_favorites_uncached(_sp, list(favorites), strict=True)
+
+def resolve_favorites(sp: SpotifyClient, favorites: List[Tuple[str, str]]) -> List[Tuple[str, str, List[str]]]:
+    """
+    Resolve (title, artist) favorites to (artist id, name, genres):
+      - Leads are matched concurrently (search calls only).
+      - Artist genres are then fetched with one bulk /artists?ids= request.
+      - Fully resolved sets are cached per (client, market, favorites) for an hour; the genre
+        pass, recommendations and buckets all resolve the same favorites on every click.
+    """
+    try:
+        return _resolve_favorites_cached(sp, sp.client_id, sp.market, tuple(favorites))
+    except Exception:
+        # Something didn't resolve (or the bulk lookup failed): recompute uncached, best effort.
+        return _resolve_favorites_uncached(sp, favorites)
+
 # =========================
 #  Suggestions helper (artist dropdowns from typed title)
 # =========================
@@ -396,26 +723,28 @@ def fetch_artist_suggestions_for_title(
     title = (title or "").strip()
     if not title:
         return []
-    sp = SpotifyClient(client_id, client_secret, market=market or "US")
     try:
-        items = sp.search_track(title, "", limit=50)
+        return _artist_suggestions_cached(client_id, client_secret, market or "US", title, limit)
     except Exception:
         return []
-    names = []
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _artist_suggestions_cached(client_id: str, client_secret: str, market: str, title: str, limit: int) -> list[str]:
+    """Per-title suggestion list, kept across reruns; a failed search raises, so it is never cached."""
+    items = get_sp_client(client_id, client_secret, market).search_track(title, "", limit=50)
+    # One pass: first-seen casing per lowercased name, stopping once `limit` names are collected.
+    seen: Dict[str, str] = {}
     for tr in items or []:
         for ar in (tr.get("artists") or []):
             name = (ar.get("name") or "").strip()
-            if name:
-                names.append(name)
-    seen, out = set(), []
-    for n in names:
-        k = n.lower()
-        if k not in seen:
-            seen.add(k)
-            out.append(n)
-        if len(out) >= limit:
-            break
-    return out
+            if not name:
+                continue
+            k = name.lower()
+            if k not in seen:
+                seen[k] = name
+                if len(seen) >= limit:
+                    return list(seen.values())
+    return list(seen.values())
 
 def artist_select_or_input(label: str, title_key: str, manual_key: str, pick_key: str, market: str) -> str:
     """
@@ -466,8 +795,12 @@ def artist_select_or_input(label: str, title_key: str, manual_key: str, pick_key
 # =========================
 def _sanitize_items(items: List) -> List[Tuple[str, str]]:
     """Ensure items are a list of (text, url) tuples; drop malformed entries."""
+    items = items or []
+    # Fast path: the recommenders already hand back (text, url) string pairs.
+    if all(type(it) is tuple and len(it) == 2 and type(it[0]) is str and type(it[1]) is str for it in items):
+        return [(text, url.strip()) for text, url in ((t.strip(), u) for t, u in items) if text]
     out: List[Tuple[str, str]] = []
-    for it in (items or []):
+    for it in items:
         if isinstance(it, (list, tuple)) and len(it) >= 2:
             text = str(it[0] or "").strip()
             url = str(it[1] or "").strip()
@@ -509,12 +842,77 @@ def render_items_section(
 # =========================
 #  Recommendation logic (with regenerate support)
 # =========================
-def _stable_shuffle(items: List[Tuple[str, str]], salt: str) -> List[Tuple[str, str]]:
-    seed_int = int.from_bytes(hashlib.sha256(salt.encode("utf-8")).digest(), "big")
-    rng = random.Random(seed_int)
-    items_copy = items.copy()
-    rng.shuffle(items_copy)
-    return items_copy
+def _safe_top_tracks(sp: SpotifyClient, client_id: str, client_secret: str, aid: str, limit: int) -> List[Dict]:
+    """Top tracks for an artist, retrying in the US market when the local one has none; [] on error."""
+    try:
+        top = sp.get_artist_top_tracks(aid, limit=limit)
+        if not top and sp.market != "US":
+            sp_us = get_sp_client(client_id, client_secret, "US")
+            top = sp_us.get_artist_top_tracks(aid, limit=limit)
+        return top or []
+    except Exception:
+        return []
+
+def _safe_related(sp: SpotifyClient, aid: str) -> List[Dict]:
+    try:
+        return sp.get_related_artists(aid) or []
+    except Exception:
+        return []
+
+def _safe_artists_by_genre(sp: SpotifyClient, genre: str, limit: int) -> List[Dict]:
+    try:
+        return sp.search_artists_by_genre(genre, limit=limit) or []
+    except Exception:
+        return []
+
+def _iter_top_tracks(sp: SpotifyClient, client_id: str, client_secret: str, aids: List[str], limit: int, wave: int = 8):
+    """
+    Yield (artist id, top tracks) in input order for early-exit scans.
+    Tracks are fetched `wave` artists at a time concurrently, so stopping early skips the remaining waves.
+    """
+    for i in range(0, len(aids), wave):
+        chunk = aids[i:i + wave]
+        yield from zip(chunk, _map_parallel(lambda aid: _safe_top_tracks(sp, client_id, client_secret, aid, limit), chunk))
+
+class RelatedArtist(NamedTuple):
+    """Candidate for the artist buckets; popularity decides 'may know' (>= 60) vs 'Discover'."""
+    name: str
+    url: str
+    pop: int = 50
+
+def _artist_url(ar: Dict) -> str:
+    """Spotify URL for an artist object, built from its id when external_urls is missing ('' if neither)."""
+    aid = ar.get("id")
+    return (ar.get("external_urls") or _EMPTY_MAP).get("spotify") or (_ARTIST_URL_TMPL % aid if aid else "")
+
+FALLBACK_GENRES = ("indie", "electronic", "hip hop", "latin", "pop")
+# Sorted genre defaults for the niche buckets when favorites carry no genres (built once, not per request).
+_BACKFILL_GENRES = tuple(sorted(FALLBACK_GENRES))
+_GENRE_POOL_DEFAULTS = tuple(sorted({"indie", "alternative", "singer-songwriter", "electronic", "hip hop", "afrobeats", "latin"}))
+
+def _genre_fallback_entries(sp: SpotifyClient, per_genre: int) -> List[Tuple[str, str]]:
+    """'Artist (genre)' entries from a fixed genre list, for when nothing could be built from favorites."""
+    out: List[Tuple[str, str]] = []
+    for g, rows in zip(FALLBACK_GENRES, _map_parallel(lambda g: _safe_artists_by_genre(sp, g, 10), FALLBACK_GENRES)):
+        for ar in rows[:per_genre]:
+            name = ar.get("name")
+            url = _artist_url(ar)
+            if name and url: out.append((f"{name} ({g})", url))
+    return out
+
+def _ranked_genres(genres: Iterable[str]) -> List[str]:
+    """Distinct genres, most frequent first, ties alphabetical; stable across processes."""
+    counts = Counter(g for g in genres if g)
+    return sorted(counts, key=lambda g: (-counts[g], g))
+
+def _track_key(title: str, artist: str) -> Tuple[str, str]:
+    """Case/whitespace-insensitive (title, artist) key used to keep the user's own favorites out of results."""
+    return (title.strip().lower(), artist.strip().lower())
+
+def _stable_sample(items: List[Tuple[str, str]], salt: str, k: int) -> List[Tuple[str, str]]:
+    """Deterministic random k items in random order; same distribution as shuffle()[:k] but O(k)."""
+    # str seeds are hashed deterministically by Random itself (unlike hash(), which is per-process)
+    return random.Random(salt).sample(items, min(max(k, 0), len(items)))
 
 def recommend_from_favorites(
     client_id: str,
@@ -524,120 +922,77 @@ def recommend_from_favorites(
     max_recs: int = 3,
     regen_nonce: int = 0,
 ) -> List[Tuple[str, str]]:
-    sp = SpotifyClient(client_id, client_secret, market=market or "US")
+    sp = get_sp_client(client_id, client_secret, market or "US")
     favorites = [(t.strip(), a.strip()) for (t, a) in favorites if t and a]
-    fav_keys = {(t.lower(), a.lower()) for (t, a) in favorites}
-    artist_infos: List[Tuple[str, str, List[str]]] = []
-    for (title, artist) in favorites:
-        resolved = resolve_artist_robust(sp, title, artist)
-        if resolved:
-            aid, aname, a_genres = resolved
-            if aid:
-                artist_infos.append((aid, aname, a_genres))
+    fav_keys = frozenset(_track_key(t, a) for (t, a) in favorites)
+    artist_infos = _unique_by_artist(resolve_favorites(sp, favorites))
     if not artist_infos:
-        mixed = []
-        for g in ["indie", "electronic", "hip hop", "latin", "pop"]:
-            try:
-                rows = sp.search_artists_by_genre(g, limit=10)
-                for ar in rows[:3]:
-                    name = ar.get("name"); url = (ar.get("external_urls") or {}).get("spotify","")
-                    if not url:
-                        aid = ar.get("id",""); url = f"https://open.spotify.com/artist/{aid}" if aid else ""
-                    if name and url: mixed.append((f"{name} ({g})", url))
-            except Exception:
-                continue
+        mixed = _genre_fallback_entries(sp, per_genre=3)
         return mixed[:max_recs] if mixed else [("Discover on Spotify", "https://open.spotify.com/explore")]
+    artist_ids = [aid for (aid, _aname, _g) in artist_infos]
     per_artist_fav: List[List[Tuple[str, str]]] = []
-    for (aid, _aname, _g) in artist_infos:
+    for top in _map_parallel(lambda aid: _safe_top_tracks(sp, client_id, client_secret, aid, 10), artist_ids):
         lst: List[Tuple[str, str]] = []
-        try:
-            top = sp.get_artist_top_tracks(aid, limit=10)
-            if not top:
-                sp_us = SpotifyClient(client_id, client_secret, market="US")
-                top = sp_us.get_artist_top_tracks(aid, limit=10)
-            for tr in top:
-                _, tname, _, pa_name, turl = SpotifyClient.extract_track_core(tr)
-                if not tname or not pa_name:
-                    continue
-                key = (tname.strip().lower(), pa_name.strip().lower())
-                if key in fav_keys:
-                    continue
-                lst.append((f"{tname} — {pa_name}", turl or ""))
-        except Exception:
-            pass
+        for tr in top:
+            _, tname, _, pa_name, turl = SpotifyClient.extract_track_core(tr)
+            if not tname or not pa_name:
+                continue
+            if _track_key(tname, pa_name) in fav_keys:
+                continue
+            lst.append((f"{tname} — {pa_name}", turl or ""))
         per_artist_fav.append(lst)
+
+    # Related artists: fetch concurrently, sample in artist order (keeps regen deterministic),
+    # then fetch every picked artist's top tracks in one concurrent wave.
     rng = random.Random(regen_nonce or 0)
-    per_artist_related: List[List[Tuple[str, str]]] = []
-    for (aid, _aname, _g) in artist_infos:
-        lst: List[Tuple[str, str]] = []
-        try:
-            related = sp.get_related_artists(aid) or []
-            rng.shuffle(related)
-            pick = related[:3] if related else []
-            for ar in pick:
-                rid = ar.get("id"); rname = ar.get("name")
-                if not rid or not rname: continue
-                url_artist = (ar.get("external_urls") or {}).get("spotify") or f"https://open.spotify.com/artist/{rid}"
-                try:
-                    rtop = sp.get_artist_top_tracks(rid, limit=5)
-                    if not rtop:
-                        sp_us = SpotifyClient(client_id, client_secret, market="US")
-                        rtop = sp_us.get_artist_top_tracks(rid, limit=5)
-                    if not rtop:
-                        lst.append((rname, url_artist))
-                    for tr in rtop:
-                        _, tname, _, pa_name, turl = SpotifyClient.extract_track_core(tr)
-                        if not tname or not pa_name: continue
-                        lst.append((f"{tname} — {pa_name}", turl or ""))
-                except Exception:
-                    lst.append((rname, url_artist))
-        except Exception:
-            pass
-        per_artist_related.append(lst)
-    fav_combined = _interleave_lists(per_artist_fav)
-    rel_combined = _interleave_lists(per_artist_related)
-    mixed: List[Tuple[str, str]] = []
-    i_f, i_r = 0, 0
-    while i_f < len(fav_combined) or i_r < len(rel_combined):
-        if i_f < len(fav_combined):
-            mixed.append(fav_combined[i_f]); i_f += 1
-        if i_r < len(rel_combined):
-            mixed.append(rel_combined[i_r]); i_r += 1
+    picks_per_artist: List[List[Tuple[str, str, str]]] = []
+    picked_ids = set()
+    for related in _map_parallel(lambda aid: _safe_related(sp, aid), artist_ids):
+        picks: List[Tuple[str, str, str]] = []
+        for ar in rng.sample(related, min(3, len(related))):
+            rid = ar.get("id"); rname = ar.get("name")
+            # Related artists shared between favorites are only fetched (and listed) once.
+            if not rid or not rname or rid in picked_ids: continue
+            picked_ids.add(rid)
+            url_artist = _artist_url(ar)
+            picks.append((rid, rname, url_artist))
+        picks_per_artist.append(picks)
+
+    def _related_entries(pick: Tuple[str, str, str]) -> List[Tuple[str, str]]:
+        rid, rname, url_artist = pick
+        rtop = _safe_top_tracks(sp, client_id, client_secret, rid, 5)
+        if not rtop:
+            return [(rname, url_artist)]
+        entries: List[Tuple[str, str]] = []
+        for tr in rtop:
+            _, tname, _, pa_name, turl = SpotifyClient.extract_track_core(tr)
+            if not tname or not pa_name: continue
+            entries.append((f"{tname} — {pa_name}", turl or ""))
+        return entries
+
+    entries_iter = iter(_map_parallel(_related_entries, [p for picks in picks_per_artist for p in picks]))
+    per_artist_related: List[List[Tuple[str, str]]] = [
+        [e for _ in picks for e in next(entries_iter)] for picks in picks_per_artist
+    ]
+    fav_combined = _interleave_lists(per_artist_fav, key=_entry_text)
+    rel_combined = _interleave_lists(per_artist_related, key=_entry_text)
+    mixed = _interleave_lists([fav_combined, rel_combined], key=_entry_text)
     if not mixed:
-        for g in ["indie", "electronic", "hip hop", "latin", "pop"]:
-            try:
-                rows = sp.search_artists_by_genre(g, limit=10)
-                for ar in rows[:2]:
-                    name = ar.get("name")
-                    aid = ar.get("id","")
-                    url = (ar.get("external_urls") or {}).get("spotify") or (f"https://open.spotify.com/artist/{aid}" if aid else "")
-                    if name and url: mixed.append((f"{name} ({g})", url))
-            except Exception:
-                continue
-    date_key = datetime.utcnow().strftime("%Y%m%d")
+        mixed = _genre_fallback_entries(sp, per_genre=2)
+    date_key = time.strftime("%Y%m%d", time.gmtime())
     salt = f"{market}|{date_key}|{'|'.join([t+'—'+a for (t,a) in favorites])}|{regen_nonce}"
-    mixed_shuffled = _stable_shuffle(mixed, salt)
-    seen, recs = set(), []
-    for (text, url) in mixed_shuffled:
-        if text not in seen:
-            seen.add(text)
-            recs.append((text, url))
-        if len(recs) >= max_recs:
-            break
-    if not recs:
-        recs = mixed_shuffled[:max_recs] if mixed_shuffled else [("Explore Spotify", "https://open.spotify.com/explore")]
-    return recs
+    # Dedupe by text (first entry wins) before shuffling, so only unique items are shuffled.
+    unique: Dict[str, Tuple[str, str]] = {}
+    for entry in mixed:
+        unique.setdefault(entry[0], entry)
+    recs = _stable_sample(list(unique.values()), salt, max_recs)
+    return recs or [("Explore Spotify", "https://open.spotify.com/explore")]
 
 def _backfill_genres_from_related(sp: SpotifyClient, fav_artist_infos: List[Tuple[str,str,List[str]]]) -> set[str]:
     genres = set()
-    for (aid, _aname, _g) in fav_artist_infos:
-        try:
-            related = sp.get_related_artists(aid)
-            for ar in related:
-                for g in (ar.get("genres") or []):
-                    if g: genres.add(g)
-        except Exception:
-            continue
+    for related in _map_parallel(lambda info: _safe_related(sp, info[0]), fav_artist_infos):
+        for ar in related:
+            genres.update(filter(None, ar.get("genres") or ()))
     return genres
 
 def build_recommendation_buckets(
@@ -650,21 +1005,17 @@ def build_recommendation_buckets(
     min_artists: int = 2,
     regen_nonce: int = 0,
 ) -> Dict[str, List[Tuple[str, str]]]:
-    sp = SpotifyClient(client_id, client_secret, market=market or "US")
+    sp = get_sp_client(client_id, client_secret, market or "US")
     favorites = [(t.strip(), a.strip()) for (t, a) in favorites if t and a]
     rng = random.Random(regen_nonce or 0)
-    fav_keys = {(t.lower(), a.lower()) for (t, a) in favorites}
-    fav_artist_names_lower = {a.lower() for (_, a) in favorites}
+    fav_keys = frozenset(_track_key(t, a) for (t, a) in favorites)
+    fav_artist_names_lower = frozenset(a.lower() for (_, a) in favorites)
 
     # Resolve favorites
-    fav_artist_infos: List[Tuple[str, str, List[str]]] = []
-    for (title, artist) in favorites:
-        r = resolve_artist_robust(sp, title, artist)
-        if r:
-            aid, aname, a_genres = r
-            if aid:
-                fav_artist_infos.append((aid, aname, a_genres or []))
+    fav_artist_infos = _unique_by_artist(resolve_favorites(sp, favorites))
     fav_artist_ids = {aid for (aid, _, _) in fav_artist_infos}
+    # Genre picks below take a prefix of this list, so order it deterministically (not by set hash).
+    fav_genres_ranked = _ranked_genres(g for (_aid, _aname, gs) in fav_artist_infos for g in (gs or []))
 
     buckets: Dict[str, List[Tuple[str, str]]] = {
         "Hidden gems from your favorite artists": [],
@@ -675,102 +1026,87 @@ def build_recommendation_buckets(
     }
 
     # ---------- 1) Hidden gems (tracks) ----------
+    # Both per-favorite endpoints are independent, so fetch them up front in one parallel wave;
+    # shuffling below still runs in favorite order so regenerate stays deterministic.
+    fav_ids = [aid for (aid, _, _) in fav_artist_infos]
+    fetched = _map_parallel(lambda job: job(), [
+        *(partial(_safe_top_tracks, sp, client_id, client_secret, aid, 10) for aid in fav_ids),
+        *(partial(_safe_related, sp, aid) for aid in fav_ids),
+    ])
+    top_per_artist, related_per_artist = fetched[:len(fav_ids)], fetched[len(fav_ids):]
+
     per_artist_hidden: List[List[Tuple[str, str]]] = []
-    for (aid, aname, _genres) in fav_artist_infos:
+    for (aid, aname, _genres), top in zip(fav_artist_infos, top_per_artist):
         lst: List[Tuple[str, str]] = []
-        try:
-            top = sp.get_artist_top_tracks(aid, limit=10)
-            if not top:
-                sp_us = SpotifyClient(client_id, client_secret, market="US")
-                top = sp_us.get_artist_top_tracks(aid, limit=10)
-            rng.shuffle(top)
-            for tr in top:
+        rng.shuffle(top)
+        for tr in top:
+            tname = tr.get("name")
+            popularity = tr.get("popularity", 50)
+            artists = tr.get("artists") or []
+            pa_name = artists[0].get("name") if artists else aname
+            turl = (tr.get("external_urls") or {}).get("spotify", "")
+            if tname and turl and popularity <= track_pop_max:
+                lst.append((f"{tname} — {pa_name}", turl))
+        if not lst:
+            for tr in top[:10]:
                 tname = tr.get("name")
-                popularity = tr.get("popularity", 50)
                 artists = tr.get("artists") or []
                 pa_name = artists[0].get("name") if artists else aname
                 turl = (tr.get("external_urls") or {}).get("spotify", "")
-                if tname and turl and popularity <= track_pop_max:
+                if tname and turl:
                     lst.append((f"{tname} — {pa_name}", turl))
-            if not lst:
-                for tr in top[:10]:
-                    tname = tr.get("name")
-                    artists = tr.get("artists") or []
-                    pa_name = artists[0].get("name") if artists else aname
-                    turl = (tr.get("external_urls") or {}).get("spotify", "")
-                    if tname and turl:
-                        lst.append((f"{tname} — {pa_name}", turl))
-        except Exception:
-            pass
         per_artist_hidden.append(lst)
-    hidden_combined = _interleave_lists(per_artist_hidden)
+    hidden_combined = _interleave_lists(per_artist_hidden, limit=max(2, per_bucket))
     if not hidden_combined:
         hidden_combined = [("Explore Spotify", "https://open.spotify.com/explore")]
-    buckets["Hidden gems from your favorite artists"] = hidden_combined[:max(2, per_bucket)]
+    buckets["Hidden gems from your favorite artists"] = hidden_combined
 
     # ---------- 2) Recommended artists (label only, with min-2 Discover) ----------
-    def _artist_url(ar: Dict) -> str:
-        return (ar.get("external_urls") or {}).get("spotify") or (f"https://open.spotify.com/artist/{ar.get('id','')}" if ar.get("id") else "")
+    related_all: List[RelatedArtist] = []
+    for rel in related_per_artist:
+        rng.shuffle(rel)
+        for ar in rel:
+            name = ar.get("name","")
+            pop = ar.get("popularity", 50)
+            url = _artist_url(ar)
+            if name and url:
+                related_all.append(RelatedArtist(name, url, pop))
 
-    related_all: List[Tuple[str, str, int]] = []
-    for (aid, _aname, _genres) in fav_artist_infos:
-        try:
-            rel = sp.get_related_artists(aid) or []
-            rng.shuffle(rel)
-            for ar in rel:
-                name = ar.get("name","")
-                pop = ar.get("popularity", 50)
+    # If thin, backfill from union genres (no pop filtering; just labeling later)
+    if len(related_all) < min_artists:
+        backfill_genres = (fav_genres_ranked or _BACKFILL_GENRES)[:5]
+        for items in _map_parallel(lambda g: _safe_artists_by_genre(sp, g, 30), backfill_genres):
+            for ar in rng.sample(items, min(10, len(items))):
+                name = ar.get("name",""); pop = ar.get("popularity",50)
                 url = _artist_url(ar)
                 if name and url:
-                    related_all.append((name, url, pop))
-        except Exception:
+                    related_all.append(RelatedArtist(name, url, pop))
+
+    # Label into categories: one pass that dedupes each bucket by name and stops once both are full
+    # (both lists are trimmed to `cap` below; with Discover full the top-up is skipped).
+    cap = max(2, per_bucket)
+    may_know: List[Tuple[str, str]] = []
+    discover: List[Tuple[str, str]] = []
+    seen_mk, seen_d = set(), set()
+    for ra in related_all:
+        k = (ra.name or "").strip().lower()
+        if not k:
             continue
-
-    # If thin, backfill from union genres (no pop filtering; just labeling later)
-    if len(related_all) < min_artists:
-        union_genres = {g for (_aid,_aname,gs) in fav_artist_infos for g in (gs or [])}
-        if not union_genres:
-            union_genres = {"indie","electronic","hip hop","pop","latin"}
-        for g in list(union_genres)[:5]:
-            try:
-                items = sp.search_artists_by_genre(g, limit=30)
-                rng.shuffle(items)
-                for ar in items[:10]:
-                    name = ar.get("name",""); pop = ar.get("popularity",50)
-                    url = _artist_url(ar)
-                    if name and url:
-                        related_all.append((name, url, pop))
-            except Exception:
-                continue
-
-    # Label into categories
-    may_know, discover = [], []
-    def _dedupe(items: List[Tuple[str,str]]) -> List[Tuple[str,str]]:
-        out, seen = [], set()
-        for n,u in items:
-            k = (n or "").strip().lower()
-            if k and k not in seen:
-                seen.add(k)
-                out.append((n,u))
-        return out
-
-    for name, url, pop in related_all:
-        if pop >= 60: may_know.append((name, url))
-        else:         discover.append((name, url))
-
-    # De-duplicate initial sets
-    may_know = _dedupe(may_know)
-    discover = _dedupe(discover)
+        target, seen = (may_know, seen_mk) if ra.pop >= 60 else (discover, seen_d)
+        if k in seen:
+            continue
+        seen.add(k)
+        target.append((ra.name, ra.url))
+        if len(may_know) >= cap and len(discover) >= cap:
+            break
 
     # --- Guarantee at least two "Discover" items ---
     def _ensure_min_discover(min_count: int = 2) -> None:
         if len(discover) >= min_count:
             return
-        exclude_names = {a.lower() for (_, a) in favorites} | {n.lower() for (n, _) in discover} | {n.lower() for (n, _) in may_know}
-        union_genres = {g for (_aid,_aname,gs) in fav_artist_infos for g in (gs or [])}
-        if not union_genres:
-            union_genres = {"indie","electronic","hip hop","pop","latin"}
-        for g in list(union_genres)[:5]:
+        # The partition's per-bucket key sets already hold every listed name, lowercased.
+        exclude_names = seen_mk | seen_d | fav_artist_names_lower
+        for g in (fav_genres_ranked or _BACKFILL_GENRES)[:5]:
             try:
                 items = sp.search_artists_by_genre(g, limit=50)
                 rng.shuffle(items)
@@ -779,10 +1115,11 @@ def build_recommendation_buckets(
                     url = _artist_url(ar)
                     if not name or not url:
                         continue
-                    if name.lower() in exclude_names:
+                    k = name.lower()
+                    if k in exclude_names:
                         continue
                     discover.append((name, url))
-                    exclude_names.add(name.lower())
+                    exclude_names.add(k)
                     if len(discover) >= min_count:
                         return
             except Exception:
@@ -791,8 +1128,8 @@ def build_recommendation_buckets(
     _ensure_min_discover(min_count=2)
 
     # Final trim per bucket settings
-    may_know = may_know[:max(2, per_bucket)]
-    discover = discover[:max(2, per_bucket)]
+    may_know = may_know[:cap]
+    discover = discover[:cap]
 
     # If absolutely empty (extreme edge), add a single explore link to avoid blanks
     if not (may_know or discover):
@@ -802,89 +1139,74 @@ def build_recommendation_buckets(
     buckets["Discover"] = discover
 
     # ---------- 3) Songs from your genres (not your input artists) ----------
-    genre_pool = {g for (_aid, _aname, genres) in fav_artist_infos for g in (genres or [])}
-    if not genre_pool:
-        genre_pool |= _backfill_genres_from_related(sp, fav_artist_infos)
-    if not genre_pool:
-        genre_pool = {"indie", "alternative", "singer-songwriter", "electronic", "hip hop", "afrobeats", "latin"}
+    genre_pool = (
+        fav_genres_ranked
+        or sorted(_backfill_genres_from_related(sp, fav_artist_infos))
+        or _GENRE_POOL_DEFAULTS
+    )
+
+    # Sections 3 and 4 read the same genre searches; fetch them once, concurrently.
+    top_genres = genre_pool[:3]
+    genre_artists = dict(zip(top_genres, _map_parallel(lambda g: _safe_artists_by_genre(sp, g, 30), top_genres)))
 
+    # The round-robin below keeps at most `cap` items (a prefix) from any one genre, so each genre
+    # stops at `cap`; _iter_top_tracks then skips the remaining waves of top-track fetches.
+    genre_target = min(cap, 12)
     per_genre_track_lists: List[List[Tuple[str, str]]] = []
-    for genre in list(genre_pool)[:3]:
+    for genre in top_genres:
         lst: List[Tuple[str, str]] = []
-        try:
-            artists_by_genre = sp.search_artists_by_genre(genre, limit=30)
-            rng.shuffle(artists_by_genre)
-            for ar in artists_by_genre:
-                aid = ar.get("id", "")
-                aname = ar.get("name", "")
-                if not aid or not aname:
-                    continue
-                if aid in fav_artist_ids or (aname.lower() in fav_artist_names_lower):
+        artists_by_genre = list(genre_artists[genre])
+        rng.shuffle(artists_by_genre)
+        candidate_ids = [
+            ar["id"] for ar in artists_by_genre
+            if ar.get("id") and ar.get("name")
+            and ar["id"] not in fav_artist_ids and ar["name"].lower() not in fav_artist_names_lower
+        ]
+        for _aid, top in _iter_top_tracks(sp, client_id, client_secret, candidate_ids, 5):
+            rng.shuffle(top)
+            for tr in top:
+                _, tname, _, pa_name, turl = SpotifyClient.extract_track_core(tr)
+                if not tname or not pa_name or not turl:
                     continue
-                try:
-                    top = sp.get_artist_top_tracks(aid, limit=5)
-                    if not top:
-                        sp_us = SpotifyClient(client_id, client_secret, market="US")
-                        top = sp_us.get_artist_top_tracks(aid, limit=5)
-                    rng.shuffle(top)
-                    for tr in top:
-                        _, tname, _, pa_name, turl = SpotifyClient.extract_track_core(tr)
-                        if not tname or not pa_name or not turl:
-                            continue
-                        key = (tname.strip().lower(), pa_name.strip().lower())
-                        if key in fav_keys:
-                            continue
-                        lst.append((f"{tname} — {pa_name}", turl))
-                        if len(lst) >= 8:
-                            break
-                except Exception:
+                if _track_key(tname, pa_name) in fav_keys:
                     continue
-                if len(lst) >= 12:
+                lst.append((f"{tname} — {pa_name}", turl))
+                if len(lst) >= 8 or len(lst) >= genre_target:
                     break
-        except Exception:
-            pass
+            if len(lst) >= genre_target:
+                break
         per_genre_track_lists.append(lst)
-    genre_tracks_combined = _interleave_lists(per_genre_track_lists)
+    genre_tracks_combined = _interleave_lists(per_genre_track_lists, limit=cap)
     if not genre_tracks_combined:
         genre_tracks_combined = [("Discover on Spotify", "https://open.spotify.com/explore")]
-    buckets["Songs from your genres (not your input artists)"] = genre_tracks_combined[:max(2, per_bucket)]
+    buckets["Songs from your genres (not your input artists)"] = genre_tracks_combined
 
     # ---------- 4) Rising stars in your genres ----------
     per_genre_lists = []
-    for genre in list(genre_pool)[:3]:
+    for genre in top_genres:
         lst = []
-        try:
-            items = sp.search_artists_by_genre(genre, limit=30)
-            rng.shuffle(items)
-            for ar in items[:10]:
-                name = ar.get("name"); aid = ar.get("id","")
-                url = (ar.get("external_urls") or {}).get("spotify") or (f"https://open.spotify.com/artist/{aid}" if aid else "")
-                if name and url:
-                    lst.append((f"{name} ({genre})", url))
-        except Exception:
-            pass
+        items = genre_artists[genre]
+        for ar in rng.sample(items, min(10, len(items))):
+            name = ar.get("name")
+            url = _artist_url(ar)
+            if name and url:
+                lst.append((f"{name} ({genre})", url))
         per_genre_lists.append(lst)
-    rising_combined = _interleave_lists(per_genre_lists)
+    rising_combined = _interleave_lists(per_genre_lists, limit=max(per_bucket, min_artists))
     if not rising_combined:
         rising_combined = [("Discover on Spotify", "https://open.spotify.com/explore")]
-    buckets["Rising stars in your genres"] = rising_combined[:max(per_bucket, min_artists)]
+    buckets["Rising stars in your genres"] = rising_combined
 
     return buckets
 
 def collect_genres_for_favorites(
     client_id: str, client_secret: str, market: str, favorites: List[Tuple[str,str]]
 ) -> List[str]:
-    sp = SpotifyClient(client_id, client_secret, market=market or "US")
-    fav_artist_infos: List[Tuple[str, str, List[str]]] = []
-    for (title, artist) in [(t.strip(), a.strip()) for (t, a) in favorites if t and a]:
-        r = resolve_artist_robust(sp, title, artist)
-        if r:
-            aid, aname, a_genres = r
-            if aid:
-                fav_artist_infos.append((aid, aname, a_genres or []))
+    sp = get_sp_client(client_id, client_secret, market or "US")
+    fav_artist_infos = resolve_favorites(sp, [(t.strip(), a.strip()) for (t, a) in favorites if t and a])
     genre_pool = [g for (_aid, _name, genres) in fav_artist_infos for g in (genres or [])]
     if len(genre_pool) == 0:
-        genre_pool = list(_backfill_genres_from_related(sp, fav_artist_infos)) or []
+        genre_pool = sorted(_backfill_genres_from_related(sp, fav_artist_infos))
     return genre_pool
 
 # =========================
@@ -969,8 +1291,17 @@ if run or regenerate:
         st.stop()
 
     # Auto genre-driven background
-    genres = collect_genres_for_favorites(CLIENT_ID, CLIENT_SECRET, market, favorites)
-    theme = pick_theme_by_genres(genres)
+    # Genres depend only on (market, favorites); Regenerate just bumps the nonce, so reuse them.
+    # Empty results aren't memoized so a transient lookup failure doesn't stick for the session.
+    genres_key = (market, tuple(favorites))
+    if st.session_state.get("_genres_key") != genres_key:
+        genres = collect_genres_for_favorites(CLIENT_ID, CLIENT_SECRET, market, favorites)
+        if genres:
+            st.session_state["_genres"] = genres
+            st.session_state["_genres_key"] = genres_key
+    else:
+        genres = st.session_state["_genres"]
+    theme, genre_badges = _theme_and_badges(tuple(genres))
     st.markdown(theme["css"], unsafe_allow_html=True)
     st.markdown(f"### {theme['emoji']} Personalized Interface (auto)")
 
@@ -978,13 +1309,7 @@ if run or regenerate:
     icons = theme["icons"]
     st.markdown(f"**{icons['artist']} Inputs:** "
                 f"`{s1_artist_val or '—'}` · `{s2_artist_val or '—'}` · `{s3_artist_val or '—'}`")
-    unique_genres = sorted(set([g.lower() for g in genres]))[:6] if genres else []
-    if unique_genres:
-        st.markdown("**🏷️ Detected genres:** " + " ".join(
-            [f"<span class='badge'>{g}</span>" for g in unique_genres]
-        ), unsafe_allow_html=True)
-    else:
-        st.markdown("**🏷️ Detected genres:** <span class='badge'>mixed/unknown</span>", unsafe_allow_html=True)
+    st.markdown(genre_badges, unsafe_allow_html=True)
 
     # Tabs
     tab_std, tab_niche = st.tabs([f"{theme['emoji']} Standard (varied)", "🌱 Niche"])
@@ -1065,6 +1390,7 @@ except Exception:
     # If your app imports st earlier, this will be a no-op
     st = None
 
+@lru_cache(maxsize=1024)
 def _norm(s: str) -> str:
     """Normalize a genre string: lowercase, strip, replace common punctuation."""
     return (s or "").strip().lower().replace("_", " ").replace("-", " ").replace("/", " ").replace("&", " and ")
@@ -1323,34 +1649,37 @@ def patch_genre_themes():
     # Do not clobber existing keys; only add missing ones
     for k, v in GENRE_THEMES_PATCH.items():
         if k not in GENRE_THEMES:
-            GENRE_THEMES[k] = dict(v)  # shallow copy
+            GENRE_THEMES[k] = _as_theme(v)
+    _resolve_norm_key.cache_clear()  # new keys can change earlier resolutions
     return GENRE_THEMES
 
 def resolve_genre_key(g: str) -> str:
     """Return the primary theme key for a raw genre/subgenre string."""
-    g0 = _norm(g)
+    return _resolve_norm_key(_norm(g))
+
+@lru_cache(maxsize=256)
+def _resolve_norm_key(g0: str) -> str:
+    """resolve_genre_key on an already-normalized string; cleared by patch_genre_themes."""
     # direct hit
     if g0 in GENRE_THEMES:
         return g0
     # alias resolution
-    if g0 in GENRE_ALIASES:
-        alias = GENRE_ALIASES[g0]
-        if alias in GENRE_THEMES:
-            return alias
-    # try loosening (remove spaces)
-    g1 = g0.replace(" ", "")
-    if g1 in GENRE_ALIASES:
-        alias = GENRE_ALIASES[g1]
+    alias = GENRE_ALIASES.get(g0)
+    if alias in GENRE_THEMES:
+        return alias
+    # try loosening (remove spaces); without a space it's the lookup above again
+    if " " in g0:
+        alias = GENRE_ALIASES.get(g0.replace(" ", ""))
         if alias in GENRE_THEMES:
             return alias
     # fallback: map subgenre to a plausible parent by keywords
-    parents = [
+    parents = (
         ("metal", "metal"), ("rock", "rock"), ("pop", "pop"), ("hip", "hip hop"), ("hop", "hip hop"),
         ("house", "house"), ("techno", "techno"), ("trance", "trance"), ("bass", "future bass"),
         ("ambient", "ambient"), ("lofi", "lo-fi"), ("jazz", "jazz"), ("blues", "blues"),
         ("latin", "latin"), ("reggae", "reggae"), ("country", "country"), ("folk", "folk"),
         ("classical", "classical"), ("soundtrack", "soundtrack"), ("opera", "opera"),
-    ]
+    )
     for kw, parent in parents:
         if kw in g0 and parent in GENRE_THEMES:
             return parent
@@ -1361,11 +1690,10 @@ def apply_theme(theme_key: str):
     """Apply the theme to the page (background gradient + accent CSS)."""
     if st is None:
         return  # streamlit not available
-    th = GENRE_THEMES.get(theme_key, {})
-    gradient = th.get("gradient", "linear-gradient(135deg,#1f1f1f 0%,#0f0f0f 100%)")
-    accent = th.get("accent", "#7bd3ff")
-    font = th.get("font", "system-ui")
-    emoji = th.get("emoji", "🎵")
+    th = GENRE_THEMES.get(theme_key)
+    if th is None:
+        th = Theme("#7bd3ff", "linear-gradient(135deg,#1f1f1f 0%,#0f0f0f 100%)")
+    gradient, accent, font, emoji = th.gradient, th.accent, th.font, th.emoji
 
     css = f"""
     <style>
@@ -1398,14 +1726,10 @@ def apply_theme(theme_key: str):
     st.caption(f"{emoji} Theme: **{theme_key.title()}**")
 
 def apply_theme_for_genres(genres):
-    """Pick the first matching theme from a list of genre strings and apply it."""
+    """Apply the theme for the first genre in the list (resolve_genre_key always yields a key)."""
     if not genres:
         return
-    for g in genres:
-        key = resolve_genre_key(g)
-        if key:
-            apply_theme(key)
-            return
+    apply_theme(resolve_genre_key(genres[0]))
 
 def _try_auto_apply():
     """Try to auto-apply based on common variable names your app might already define."""
@@ -1418,14 +1742,8 @@ def _try_auto_apply():
                 candidates.extend(list(val))
             elif isinstance(val, dict):
                 candidates.extend(list(val.keys()))
-    # de-duplicate while preserving order
-    seen = set()
-    ordered = []
-    for g in candidates:
-        gn = _norm(g)
-        if gn and gn not in seen:
-            ordered.append(gn)
-            seen.add(gn)
+    # de-duplicate while preserving order (dicts keep insertion order)
+    ordered = [gn for gn in dict.fromkeys(map(_norm, candidates)) if gn]
     if ordered:
         apply_theme_for_genres(ordered)
 
@@ -1444,6 +1762,7 @@ try:
 except Exception:
     st = None
 
+@lru_cache(maxsize=1024)
 def _norm(s: str) -> str:
     return (s or "").strip().lower().replace("_", " ").replace("-", " ").replace("/", " ").replace("&", " and ")
 
@@ -1522,21 +1841,27 @@ def patch_genre_themes():
     if "GENRE_THEMES" not in globals() or not isinstance(globals().get("GENRE_THEMES"), dict):
         GENRE_THEMES = {}
     for k, v in GENRE_THEMES_PATCH.items():
-        GENRE_THEMES.setdefault(k, dict(v))
+        if k not in GENRE_THEMES:
+            GENRE_THEMES[k] = _as_theme(v)
+    _resolve_norm_key.cache_clear()  # new keys can change earlier resolutions
     return GENRE_THEMES
 
 def resolve_genre_key(g: str) -> str:
-    g0 = _norm(g)
+    return _resolve_norm_key(_norm(g))
+
+@lru_cache(maxsize=256)
+def _resolve_norm_key(g0: str) -> str:
     if g0 in GENRE_THEMES: return g0
-    if g0 in GENRE_ALIASES and GENRE_ALIASES[g0] in GENRE_THEMES:
-        return GENRE_ALIASES[g0]
+    alias = GENRE_ALIASES.get(g0)
+    if alias in GENRE_THEMES:
+        return alias
     # simple parent inference (non-neon, muted defaults)
-    parents = [("metal","metal"),("rock","rock"),("pop","pop"),("hip","hip hop"),
+    parents = (("metal","metal"),("rock","rock"),("pop","pop"),("hip","hip hop"),
                ("house","house"),("techno","techno"),("trance","trance"),
                ("ambient","ambient"),("lo fi","lo-fi"),("jazz","jazz"),
                ("blues","blues"),("latin","latin"),("reggae","reggae"),
                ("country","country"),("folk","folk"),("classical","classical"),
-               ("soundtrack","soundtrack")]
+               ("soundtrack","soundtrack"))
     for kw, parent in parents:
         if kw in g0 and parent in GENRE_THEMES:
             return parent
@@ -1545,11 +1870,10 @@ def resolve_genre_key(g: str) -> str:
 def apply_theme(theme_key: str):
     if st is None:
         return
-    th = GENRE_THEMES.get(theme_key, {})
-    gradient = th.get("gradient", "linear-gradient(135deg,#262626 0%,#1f1f1f 100%)")
-    accent = th.get("accent", "#8fa3b8")
-    font = th.get("font", "system-ui")
-    emoji = th.get("emoji", "🎵")
+    th = GENRE_THEMES.get(theme_key)
+    if th is None:
+        th = Theme("#8fa3b8", "linear-gradient(135deg,#262626 0%,#1f1f1f 100%)")
+    gradient, accent, font, emoji = th.gradient, th.accent, th.font, th.emoji
 
     # Softer text colors
     base_text = "#eaeaea"
@@ -1580,9 +1904,7 @@ def apply_theme(theme_key: str):
 
 def apply_theme_for_genres(genres):
     if not genres: return
-    for g in genres:
-        apply_theme(resolve_genre_key(g))
-        return
+    apply_theme(resolve_genre_key(genres[0]))
 
 def _try_auto_apply():
     patch_genre_themes()
@@ -1596,12 +1918,8 @@ def _try_auto_apply():
                 found += list(val)
             elif isinstance(val, dict):
                 found += list(val.keys())
-    # de-dup
-    seen, ordered = set(), []
-    for g in found:
-        gn = _norm(g)
-        if gn and gn not in seen:
-            ordered.append(gn); seen.add(gn)
+    # de-dup, keeping first-seen order
+    ordered = [gn for gn in dict.fromkeys(map(_norm, found)) if gn]
     if ordered:
         apply_theme_for_genres(ordered)
 